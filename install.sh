@@ -86,6 +86,7 @@ apt-get install -y \
     python3 \
     python3-pip \
     python3-venv \
+    libturbojpeg0 \
     git \
     chromium-browser \
     unclutter \
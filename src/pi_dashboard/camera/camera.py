@@ -1,35 +1,81 @@
 """Camera module for displaying camera feeds."""
 
-import base64
 import logging
-from threading import Thread, Lock
-from typing import Optional, List, Dict
+import time
+from threading import Thread, Condition
+from typing import Any, Optional, List, Dict, Tuple
 
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
-    logging.warning("OpenCV not available - camera features will be disabled")
+from flask import render_template, request, Response
+
+# OpenCV and libjpeg-turbo are imported on first camera start (see _import_cv2)
+cv2: Any = None
+CV2_AVAILABLE: Optional[bool] = None
+_tj: Any = None
+TJSAMP_420: Any = None
+TURBOJPEG_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+def _import_cv2() -> bool:
+    """Import OpenCV and libjpeg-turbo on first use.
+    
+    OpenCV is slow to load and adds tens of MB of RSS, so deployments with
+    the camera module disabled never pay for it.
+    
+    Returns:
+        True if OpenCV is available
+    """
+    global cv2, CV2_AVAILABLE, _tj, TJSAMP_420, TURBOJPEG_AVAILABLE
+    if CV2_AVAILABLE is not None:
+        return CV2_AVAILABLE
+    
+    try:
+        import cv2
+        CV2_AVAILABLE = True
+    except ImportError:
+        CV2_AVAILABLE = False
+        logger.warning("OpenCV not available - camera features will be disabled")
+        return False
+    
+    try:
+        from turbojpeg import TurboJPEG, TJSAMP_420
+        _tj = TurboJPEG()
+        TURBOJPEG_AVAILABLE = True
+    except (ImportError, OSError, RuntimeError):
+        logger.warning("libjpeg-turbo not available - falling back to OpenCV JPEG encoding")
+    
+    return True
+
+
+# multipart/x-mixed-replace framing around each MJPEG frame
+_MJPEG_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+_MJPEG_TRAILER = b'\r\n'
+
+
 class CameraFeed:
     """Handles a single camera feed."""
     
-    def __init__(self, camera_id: int = 0, name: str = "Camera"):
+    def __init__(self, camera_id: int = 0, name: str = "Camera",
+                 stream_width: Optional[int] = None, stream_height: Optional[int] = None):
         """Initialize camera feed.
         
         Args:
             camera_id: Camera device ID (0 for default)
             name: Display name for the camera
+            stream_width: Width of downscaled thumbnail frames (None to disable)
+            stream_height: Height of downscaled thumbnail frames (None to disable)
         """
         self.camera_id = camera_id
         self.name = name
+        self.stream_width = stream_width
+        self.stream_height = stream_height
         self.camera = None
         self.frame = None
-        self.lock = Lock()
+        self._frame_seq = 0
+        # Encoded JPEG per variant ('full' / 'thumb'), as (frame_seq, bytes)
+        self._jpeg_cache: Dict[str, Tuple[int, bytes]] = {}
+        self.cond = Condition()
         self.running = False
         self.thread = None
         
@@ -39,7 +85,7 @@ class CameraFeed:
         Returns:
             True if camera started successfully
         """
-        if not CV2_AVAILABLE:
+        if not _import_cv2():
             logger.error("OpenCV not available")
             return False
             
@@ -71,8 +117,11 @@ class CameraFeed:
             try:
                 ret, frame = self.camera.read()
                 if ret:
-                    with self.lock:
+                    with self.cond:
                         self.frame = frame
+                        self._frame_seq += 1
+                        self._jpeg_cache = {}
+                        self.cond.notify_all()
             except Exception as e:
                 logger.error(f"Error capturing frame: {e}")
                 break
@@ -80,33 +129,99 @@ class CameraFeed:
     def get_frame_jpeg(self) -> Optional[bytes]:
         """Get current frame as JPEG bytes.
         
+        Each captured frame is encoded at most once; repeat requests for the
+        same frame return the cached bytes.
+        
+        Returns:
+            JPEG encoded frame or None
+        """
+        return self._get_jpeg('full')[1]
+    
+    def get_frame_jpeg_thumb(self) -> Optional[bytes]:
+        """Get current frame downscaled to the stream size as JPEG bytes.
+        
+        Falls back to the full-resolution frame if no stream size is set.
+        
         Returns:
             JPEG encoded frame or None
         """
-        with self.lock:
+        return self.get_frame_jpeg_thumb_seq()[1]
+    
+    def get_frame_jpeg_thumb_seq(self) -> Tuple[int, Optional[bytes]]:
+        """Like get_frame_jpeg_thumb, also returning the frame's sequence number.
+        
+        Returns:
+            Tuple of (sequence number of the encoded frame, JPEG bytes or None)
+        """
+        if not (self.stream_width and self.stream_height):
+            return self._get_jpeg('full')
+        return self._get_jpeg('thumb')
+    
+    def _get_jpeg(self, variant: str) -> Tuple[int, Optional[bytes]]:
+        """Encode the current frame, reusing the cached result if unchanged.
+        
+        Args:
+            variant: 'full' for capture resolution, 'thumb' for stream size
+            
+        Returns:
+            Tuple of (sequence number of the encoded frame, JPEG bytes or None)
+        """
+        with self.cond:
+            seq = self._frame_seq
             if self.frame is None:
-                return None
+                return seq, None
             
-            try:
-                # Encode frame as JPEG
-                ret, buffer = cv2.imencode('.jpg', self.frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                if ret:
-                    return buffer.tobytes()
-            except Exception as e:
-                logger.error(f"Error encoding frame: {e}")
-                
-        return None
+            cached = self._jpeg_cache.get(variant)
+            if cached is not None and cached[0] == seq:
+                return cached
+            
+            # read() hands back a fresh array per frame, so the reference
+            # stays valid after the capture thread moves on
+            frame = self.frame
+        
+        # Encode outside the lock so capture is not blocked
+        try:
+            if variant == 'thumb':
+                size = (self.stream_width, self.stream_height)
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            
+            # Encode frame as JPEG, preferring libjpeg-turbo's SIMD encoder
+            if TURBOJPEG_AVAILABLE:
+                jpeg = _tj.encode(frame, quality=85, jpeg_subsample=TJSAMP_420)
+            else:
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                if not ret:
+                    return seq, None
+                jpeg = buffer.tobytes()
+        except Exception as e:
+            logger.error(f"Error encoding frame: {e}")
+            return seq, None
+        
+        with self.cond:
+            if self._frame_seq == seq:
+                self._jpeg_cache[variant] = (seq, jpeg)
+        
+        return seq, jpeg
     
-    def get_frame_base64(self) -> Optional[str]:
-        """Get current frame as base64 encoded string.
+    @property
+    def frame_seq(self) -> int:
+        """Sequence number of the most recently captured frame."""
+        return self._frame_seq
+    
+    def wait_for_frame(self, last_seq: int, timeout: float = 1.0) -> int:
+        """Block until a frame newer than last_seq has been captured.
         
+        Args:
+            last_seq: Sequence number of the last frame the caller consumed
+            timeout: Maximum seconds to wait
+            
         Returns:
-            Base64 encoded JPEG frame or None
+            Current frame sequence number (unchanged on timeout)
         """
-        jpeg_bytes = self.get_frame_jpeg()
-        if jpeg_bytes:
-            return base64.b64encode(jpeg_bytes).decode('utf-8')
-        return None
+        with self.cond:
+            self.cond.wait_for(lambda: self._frame_seq != last_seq, timeout=timeout)
+            return self._frame_seq
     
     def stop(self):
         """Stop capturing from camera."""
@@ -121,16 +236,29 @@ class CameraFeed:
 class CameraModule:
     """Manages multiple camera feeds."""
     
-    def __init__(self, app=None, socketio=None):
+    # Seconds to wait for a frame ack before assuming it was lost
+    ACK_TIMEOUT = 2.0
+    
+    def __init__(self, app=None, socketio=None,
+                 stream_width: Optional[int] = None, stream_height: Optional[int] = None):
         """Initialize camera module.
         
         Args:
             app: Flask app instance
             socketio: SocketIO instance
+            stream_width: Width of frames sent over Socket.IO (None for full size)
+            stream_height: Height of frames sent over Socket.IO (None for full size)
         """
         self.app = app
         self.socketio = socketio
+        self.stream_width = stream_width
+        self.stream_height = stream_height
         self.feeds: Dict[int, CameraFeed] = {}
+        # Last frame sequence each client acknowledged (-1 before the first
+        # ack), keyed by (sid, camera_id); removed when the client disconnects
+        self._last_sent_seq: Dict[Tuple[str, int], int] = {}
+        # Frame sent but not yet acked, as (frame_seq, monotonic send time)
+        self._in_flight: Dict[Tuple[str, int], Tuple[int, float]] = {}
         
         if app and socketio:
             self.init_app(app, socketio)
@@ -148,24 +276,30 @@ class CameraModule:
         # Register routes
         @app.route('/camera')
         def camera_view():
-            from flask import render_template
             return render_template('camera.html', feeds=self.feeds)
         
         @app.route('/camera/<int:camera_id>/stream')
         def camera_stream(camera_id):
             """Stream camera feed as MJPEG."""
-            from flask import Response
             
             def generate():
                 feed = self.feeds.get(camera_id)
                 if not feed:
                     return
-                    
-                while True:
+                
+                last_seq = 0
+                while feed.running:
+                    # Only yield when the capture thread has published a new frame
+                    seq = feed.wait_for_frame(last_seq)
+                    if seq == last_seq:
+                        continue
+                    last_seq = seq
                     frame = feed.get_frame_jpeg()
                     if frame:
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+                        # Separate chunks avoid copying the frame into a new bytes object
+                        yield _MJPEG_HEADER
+                        yield frame
+                        yield _MJPEG_TRAILER
             
             return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
         
@@ -176,13 +310,47 @@ class CameraModule:
             camera_id = data.get('camera_id', 0)
             feed = self.feeds.get(camera_id)
             
-            if feed:
-                frame_b64 = feed.get_frame_base64()
-                if frame_b64:
-                    socketio.emit('camera_frame', {
-                        'camera_id': camera_id,
-                        'frame': frame_b64
-                    })
+            if not feed:
+                return
+            
+            key = (request.sid, camera_id)
+            
+            # Backpressure: hold off while the previous frame is unacked,
+            # unless the ack is overdue and presumed lost
+            pending = self._in_flight.get(key)
+            if pending is not None and time.monotonic() - pending[1] < self.ACK_TIMEOUT:
+                return
+            
+            # Skip if this client already acknowledged the current frame
+            if self._last_sent_seq.get(key) == feed.frame_seq:
+                return
+            
+            # Use the sequence of the frame actually encoded, which may be
+            # newer than the one checked above
+            seq, frame = feed.get_frame_jpeg_thumb_seq()
+            if self._last_sent_seq.get(key) == seq:
+                return
+            
+            def on_ack(*args):
+                # Only confirmed receipts advance the client's cursor. A missing
+                # key means the client disconnected; ignore its late ack.
+                if key not in self._last_sent_seq:
+                    return
+                self._last_sent_seq[key] = max(self._last_sent_seq[key], seq)
+                # A late ack for an older, timed-out frame leaves the newer one pending
+                pending = self._in_flight.get(key)
+                if pending is not None and pending[0] <= seq:
+                    self._in_flight.pop(key, None)
+            
+            if frame:
+                # Register the client so on_ack can tell it is still connected
+                self._last_sent_seq.setdefault(key, -1)
+                self._in_flight[key] = (seq, time.monotonic())
+                # Sent as a binary attachment, no base64 round-trip
+                socketio.emit('camera_frame', {
+                    'camera_id': camera_id,
+                    'frame': frame
+                }, to=request.sid, callback=on_ack)
     
     def add_camera(self, camera_id: int = 0, name: str = "Camera") -> bool:
         """Add and start a camera feed.
@@ -198,7 +366,9 @@ class CameraModule:
             logger.warning(f"Camera {camera_id} already exists")
             return True
         
-        feed = CameraFeed(camera_id=camera_id, name=name)
+        feed = CameraFeed(camera_id=camera_id, name=name,
+                          stream_width=self.stream_width,
+                          stream_height=self.stream_height)
         if feed.start():
             self.feeds[camera_id] = feed
             return True
@@ -214,6 +384,16 @@ class CameraModule:
             self.feeds[camera_id].stop()
             del self.feeds[camera_id]
     
+    def client_disconnected(self, sid: str):
+        """Forget per-client frame state.
+        
+        Args:
+            sid: Socket.IO session ID of the disconnected client
+        """
+        for key in [k for k in self._last_sent_seq if k[0] == sid]:
+            del self._last_sent_seq[key]
+            self._in_flight.pop(key, None)
+    
     def stop_all(self):
         """Stop all camera feeds."""
         for feed in self.feeds.values():
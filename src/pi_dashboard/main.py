@@ -9,12 +9,18 @@ import logging
 from pathlib import Path
 from typing import Optional
 
-from flask import Flask, render_template
+from flask import Flask, render_template, request
 from flask_socketio import SocketIO
 
 from pi_dashboard.camera import CameraModule
 from pi_dashboard.media import MediaModule
-from pi_dashboard.system import SystemModule
+from pi_dashboard.system import SystemModule, SystemMonitor
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 # Configure logging
@@ -25,6 +31,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class _OrjsonCodec:
+    """Stdlib-compatible json interface backed by orjson for Socket.IO packets."""
+    
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        # orjson output is always compact, so stdlib options like separators are ignored
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
 class PiDashboard:
     """Main dashboard application class."""
     
@@ -39,7 +58,11 @@ class PiDashboard:
                          template_folder=self._get_template_dir(),
                          static_folder=self._get_static_dir())
         self.app.config['SECRET_KEY'] = self.config.get('secret_key', 'dev-secret-key')
-        self.socketio = SocketIO(self.app, cors_allowed_origins="*")
+        socketio_options = {}
+        if ORJSON_AVAILABLE:
+            # python-socketio hands the json module on to engine.io as well
+            socketio_options['json'] = _OrjsonCodec
+        self.socketio = SocketIO(self.app, cors_allowed_origins="*", **socketio_options)
         
         # Module registry
         self.modules = {}
@@ -99,7 +122,7 @@ class PiDashboard:
                 "debug": False
             },
             "modules": {
-                "camera": {"enabled": True},
+                "camera": {"enabled": True, "stream_width": 320, "stream_height": 240},
                 "media": {"enabled": True},
                 "system": {"enabled": True},
                 "weather": {"enabled": False}
@@ -127,7 +150,10 @@ class PiDashboard:
         """Initialize dashboard modules."""
         # Camera module
         if self.config.get('modules', {}).get('camera', {}).get('enabled', True):
-            self.modules['camera'] = CameraModule(self.app, self.socketio)
+            camera_config = self.config.get('modules', {}).get('camera', {})
+            self.modules['camera'] = CameraModule(self.app, self.socketio,
+                                                  stream_width=camera_config.get('stream_width'),
+                                                  stream_height=camera_config.get('stream_height'))
             logger.info("Camera module initialized")
         
         # Media module
@@ -169,12 +195,13 @@ class PiDashboard:
         def handle_disconnect():
             """Handle client disconnection."""
             logger.info("Client disconnected")
+            if 'camera' in self.modules:
+                self.modules['camera'].client_disconnected(request.sid)
         
         @self.socketio.on('get_stats')
         def handle_get_stats():
             """Send current system stats."""
             if 'system' in self.modules:
-                from pi_dashboard.system import SystemMonitor
                 stats = SystemMonitor.get_all_stats()
                 self.socketio.emit('stats_update', stats)
     
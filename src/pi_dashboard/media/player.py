@@ -3,7 +3,10 @@
 import os
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from threading import Lock
+from typing import List, Dict, Iterator, Optional, Tuple
+
+from flask import render_template, jsonify, request, send_file, abort
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +14,12 @@ logger = logging.getLogger(__name__)
 class MediaLibrary:
     """Manages media library and file scanning."""
     
-    SUPPORTED_VIDEO = {'.mp4', '.mkv', '.avi', '.mov', '.m4v', '.webm'}
-    SUPPORTED_AUDIO = {'.mp3', '.m4a', '.wav', '.flac', '.ogg'}
+    EXT_TO_TYPE = (
+        {ext: 'video' for ext in ('.mp4', '.mkv', '.avi', '.mov', '.m4v', '.webm')}
+        | {ext: 'audio' for ext in ('.mp3', '.m4a', '.wav', '.flac', '.ogg')}
+    )
+    SUPPORTED_VIDEO = {ext for ext, kind in EXT_TO_TYPE.items() if kind == 'video'}
+    SUPPORTED_AUDIO = {ext for ext, kind in EXT_TO_TYPE.items() if kind == 'audio'}
     
     def __init__(self, library_path: str):
         """Initialize media library.
@@ -22,46 +29,90 @@ class MediaLibrary:
         """
         self.library_path = Path(library_path)
         self.media_files: List[Dict] = []
+        self._by_path: Dict[str, Dict] = {}
+        self._by_type: Dict[str, List[Dict]] = {'video': [], 'audio': []}
         
     def scan(self) -> List[Dict]:
         """Scan library for media files.
         
+        The previous results stay visible until the new scan completes, so
+        the library can be read while a scan runs in the background.
+        
         Returns:
             List of media file information
         """
-        self.media_files = []
+        media_files: List[Dict] = []
+        by_path: Dict[str, Dict] = {}
+        by_type: Dict[str, List[Dict]] = {'video': [], 'audio': []}
         
         if not self.library_path.exists():
             logger.warning(f"Media library path does not exist: {self.library_path}")
-            return self.media_files
-        
-        try:
-            for file_path in self.library_path.rglob('*'):
-                if file_path.is_file():
-                    ext = file_path.suffix.lower()
+        else:
+            library_root = self.library_path.resolve()
+            try:
+                for entry, relative_path in self._walk(str(self.library_path), ''):
+                    name, ext = os.path.splitext(entry.name)
+                    ext = ext.lower()
+                    media_type = self.EXT_TO_TYPE.get(ext)
+                    if media_type is None:
+                        continue
                     
-                    if ext in self.SUPPORTED_VIDEO or ext in self.SUPPORTED_AUDIO:
-                        media_type = 'video' if ext in self.SUPPORTED_VIDEO else 'audio'
-                        
-                        self.media_files.append({
-                            'name': file_path.stem,
-                            'filename': file_path.name,
-                            'path': str(file_path),
-                            'relative_path': str(file_path.relative_to(self.library_path)),
-                            'type': media_type,
-                            'extension': ext,
-                            'size': file_path.stat().st_size,
-                            'modified': file_path.stat().st_mtime
-                        })
-            
-            # Sort by name
-            self.media_files.sort(key=lambda x: x['name'].lower())
-            logger.info(f"Found {len(self.media_files)} media files")
-            
-        except Exception as e:
-            logger.error(f"Error scanning media library: {e}")
+                    # Symlinks are listed only if media_stream will serve them
+                    if entry.is_symlink():
+                        try:
+                            Path(entry.path).resolve().relative_to(library_root)
+                        except ValueError:
+                            continue
+                    
+                    # DirEntry caches the stat result, one syscall at most
+                    stat = entry.stat()
+                    
+                    media_files.append({
+                        'name': name,
+                        'filename': entry.name,
+                        'path': entry.path,
+                        'relative_path': relative_path,
+                        'type': media_type,
+                        'extension': ext,
+                        'size': stat.st_size,
+                        'modified': stat.st_mtime
+                    })
+                
+                # Sort by name
+                media_files.sort(key=lambda x: x['name'].lower())
+                logger.info(f"Found {len(media_files)} media files")
+                
+            except Exception as e:
+                logger.error(f"Error scanning media library: {e}")
         
-        return self.media_files
+        # Index for O(1) lookups; the type lists inherit the sort order
+        for media in media_files:
+            by_path[media['path']] = media
+            by_type[media['type']].append(media)
+        
+        self.media_files, self._by_path, self._by_type = media_files, by_path, by_type
+        return media_files
+    
+    def _walk(self, directory: str, prefix: str) -> Iterator[Tuple[os.DirEntry, str]]:
+        """Recursively yield files under a directory.
+        
+        Args:
+            directory: Directory to scan
+            prefix: Path of directory relative to the library root
+            
+        Yields:
+            Tuples of (DirEntry, path relative to the library root)
+        """
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative_path = os.path.join(prefix, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from self._walk(entry.path, relative_path)
+                    elif entry.is_file():
+                        yield entry, relative_path
+        except OSError as e:
+            logger.warning(f"Skipping unreadable directory {directory}: {e}")
     
     def get_files(self, media_type: Optional[str] = None) -> List[Dict]:
         """Get list of media files.
@@ -73,7 +124,7 @@ class MediaLibrary:
             List of media file information
         """
         if media_type:
-            return [f for f in self.media_files if f['type'] == media_type]
+            return self._by_type.get(media_type, [])
         return self.media_files
     
     def get_file(self, path: str) -> Optional[Dict]:
@@ -85,10 +136,7 @@ class MediaLibrary:
         Returns:
             Media file information or None
         """
-        for media in self.media_files:
-            if media['path'] == path:
-                return media
-        return None
+        return self._by_path.get(path)
 
 
 class MediaModule:
@@ -107,6 +155,8 @@ class MediaModule:
         self.library_path = library_path or os.path.expanduser("~/media")
         self.library = MediaLibrary(self.library_path)
         self.current_media: Optional[Dict] = None
+        self._scan_lock = Lock()
+        self._scanning = False
         
         if app and socketio:
             self.init_app(app, socketio)
@@ -123,38 +173,44 @@ class MediaModule:
         
         # Scan library on init
         self.library.scan()
+        library_root = Path(self.library_path).resolve()
         
         # Register routes
         @app.route('/media')
         def media_view():
-            from flask import render_template
             return render_template('media.html', 
                                  video_count=len(self.library.get_files('video')),
                                  audio_count=len(self.library.get_files('audio')))
         
         @app.route('/media/api/files')
         def media_files():
-            from flask import jsonify, request
             media_type = request.args.get('type')
             files = self.library.get_files(media_type)
             return jsonify(files)
         
         @app.route('/media/api/scan')
         def media_scan():
-            from flask import jsonify
-            files = self.library.scan()
-            return jsonify({'count': len(files), 'files': files})
+            """Start a background rescan; completion is signalled over Socket.IO."""
+            if not self.start_scan():
+                return jsonify({'status': 'scanning'})
+            return jsonify({'status': 'started', 'count': len(self.library.media_files)})
         
         @app.route('/media/stream/<path:filepath>')
         def media_stream(filepath):
             """Stream media file."""
-            from flask import send_file
-            file_path = Path(self.library_path) / filepath
+            file_path = (library_root / filepath).resolve()
+            
+            # Reject anything that resolves outside the library (../, symlinks)
+            try:
+                file_path.relative_to(library_root)
+            except ValueError:
+                abort(404)
             
-            if file_path.exists() and file_path.is_file():
-                return send_file(str(file_path))
+            if file_path.is_file():
+                # conditional answers Range requests with 206 partial content,
+                # so players can seek without fetching the whole file
+                return send_file(str(file_path), conditional=True)
             
-            from flask import abort
             abort(404)
         
         # Socket.IO events
@@ -183,6 +239,31 @@ class MediaModule:
             self.current_media = None
             socketio.emit('media_status', {'status': 'stopped'})
     
+    def start_scan(self) -> bool:
+        """Rescan the library in a background task.
+        
+        Emits 'media_scan_complete' when done.
+        
+        Returns:
+            False if a scan is already in progress
+        """
+        with self._scan_lock:
+            if self._scanning:
+                return False
+            self._scanning = True
+        
+        self.socketio.start_background_task(self._scan_task)
+        return True
+    
+    def _scan_task(self):
+        """Run a library scan and announce the result."""
+        try:
+            files = self.library.scan()
+        finally:
+            with self._scan_lock:
+                self._scanning = False
+        self.socketio.emit('media_scan_complete', {'count': len(files)})
+    
     def get_library_stats(self) -> Dict:
         """Get media library statistics.
         
@@ -1,86 +1,156 @@
 """System monitoring module for Raspberry Pi stats."""
 
-import psutil
+import os
 import logging
-from typing import Dict, Any
-from threading import Thread
+from typing import Dict, Any, Optional, Tuple
 import time
 
+from flask import render_template, jsonify
+
 logger = logging.getLogger(__name__)
 
+# Imported on first probe (see _psutil) to keep it out of startup
+psutil: Any = None
+
+
+def _psutil():
+    """Import psutil on first use.
+    
+    Returns:
+        The psutil module
+    """
+    global psutil
+    if psutil is None:
+        import psutil
+    return psutil
+
 
 class SystemMonitor:
     """Monitor system resources and stats."""
     
+    # Seconds a get_all_stats() snapshot is shared between callers
+    CACHE_TTL = 0.2
+    _cache: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+    
+    # Values that never change while the system is up, read once
+    _boot_time: Optional[float] = None
+    _cpu_count: Optional[Dict[str, int]] = None
+    
+    THERMAL_ZONE_PATH = '/sys/class/thermal/thermal_zone0/temp'
+    # Kept open and re-read with pread(); None until first use, -1 if unavailable
+    _temp_fd: Optional[int] = None
+    
+    # Latest value from the background CPU sampler (see SystemModule)
+    _cpu_usage: Optional[float] = None
+    # CPU times at priming, for readings taken before the sampler's first run
+    _prime_times: Any = None
+    
+    def __init__(self):
+        """Initialize system monitor."""
+        # Prime the CPU counters so the first non-blocking sample is meaningful
+        _psutil().cpu_percent(interval=None)
+        SystemMonitor._prime_times = _psutil().cpu_times()
+    
+    @staticmethod
+    def sample_cpu() -> float:
+        """Take a CPU usage sample covering the time since the previous sample.
+        
+        Called at a fixed interval by the background sampler so every
+        consumer sees the same, evenly spaced measurement window.
+        """
+        SystemMonitor._cpu_usage = round(_psutil().cpu_percent(interval=None), 1)
+        return SystemMonitor._cpu_usage
+    
     @staticmethod
     def get_cpu_usage() -> float:
-        """Get CPU usage percentage."""
-        return round(psutil.cpu_percent(interval=0.5), 1)
+        """Get the latest sampled CPU usage percentage (non-blocking).
+        
+        Before the sampler's first run this reports usage since priming,
+        without resetting the counters the sampler's first window starts from.
+        """
+        if SystemMonitor._cpu_usage is not None:
+            return SystemMonitor._cpu_usage
+        
+        before = SystemMonitor._prime_times
+        if before is None:
+            return 0.0
+        after = _psutil().cpu_times()
+        total: float = sum(after) - sum(before)
+        idle: float = (after.idle + getattr(after, 'iowait', 0.0)) - \
+            (before.idle + getattr(before, 'iowait', 0.0))
+        if total <= 0:
+            return 0.0
+        return round(max(0.0, min(100.0, (total - idle) / total * 100)), 1)
     
     @staticmethod
     def get_cpu_count() -> Dict[str, int]:
         """Get CPU count information."""
-        return {
-            'physical': psutil.cpu_count(logical=False) or 1,
-            'logical': psutil.cpu_count(logical=True) or 1
-        }
+        if SystemMonitor._cpu_count is None:
+            SystemMonitor._cpu_count = {
+                'physical': _psutil().cpu_count(logical=False) or 1,
+                'logical': _psutil().cpu_count(logical=True) or 1
+            }
+        return SystemMonitor._cpu_count
     
     @staticmethod
     def get_memory_usage() -> Dict[str, Any]:
         """Get memory usage information."""
-        mem = psutil.virtual_memory()
+        mem = _psutil().virtual_memory()
         return {
             'total': mem.total,
             'available': mem.available,
             'used': mem.used,
-            'percent': round(mem.percent, 1),
-            'total_gb': round(mem.total / (1024**3), 2),
-            'used_gb': round(mem.used / (1024**3), 2),
-            'available_gb': round(mem.available / (1024**3), 2)
+            'percent': round(mem.percent, 1)
         }
     
     @staticmethod
     def get_disk_usage() -> Dict[str, Any]:
         """Get disk usage information."""
-        disk = psutil.disk_usage('/')
+        disk = _psutil().disk_usage('/')
         return {
             'total': disk.total,
             'used': disk.used,
             'free': disk.free,
-            'percent': round(disk.percent, 1),
-            'total_gb': round(disk.total / (1024**3), 2),
-            'used_gb': round(disk.used / (1024**3), 2),
-            'free_gb': round(disk.free / (1024**3), 2)
+            'percent': round(disk.percent, 1)
         }
     
     @staticmethod
     def get_temperature() -> float:
         """Get CPU temperature (Raspberry Pi specific)."""
+        if SystemMonitor._temp_fd is None:
+            try:
+                SystemMonitor._temp_fd = os.open(SystemMonitor.THERMAL_ZONE_PATH, os.O_RDONLY)
+            except OSError:
+                SystemMonitor._temp_fd = -1
+        
+        if SystemMonitor._temp_fd < 0:
+            # Not on a Raspberry Pi or no sensor available
+            return 0.0
+        
         try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = float(f.read()) / 1000.0
-                return round(temp, 1)
+            # sysfs regenerates the value on every read from offset 0
+            temp = float(os.pread(SystemMonitor._temp_fd, 16, 0)) / 1000.0
+            return round(temp, 1)
         except Exception:
-            # Not on a Raspberry Pi or no sensor available
             return 0.0
     
     @staticmethod
     def get_network_stats() -> Dict[str, Any]:
         """Get network interface statistics."""
-        net_io = psutil.net_io_counters()
+        net_io = _psutil().net_io_counters()
         return {
             'bytes_sent': net_io.bytes_sent,
             'bytes_recv': net_io.bytes_recv,
             'packets_sent': net_io.packets_sent,
-            'packets_recv': net_io.packets_recv,
-            'mb_sent': round(net_io.bytes_sent / (1024**2), 2),
-            'mb_recv': round(net_io.bytes_recv / (1024**2), 2)
+            'packets_recv': net_io.packets_recv
         }
     
     @staticmethod
     def get_uptime() -> Dict[str, Any]:
         """Get system uptime."""
-        boot_time = psutil.boot_time()
+        if SystemMonitor._boot_time is None:
+            SystemMonitor._boot_time = _psutil().boot_time()
+        boot_time = SystemMonitor._boot_time
         uptime_seconds = time.time() - boot_time
         
         days = int(uptime_seconds // 86400)
@@ -95,8 +165,17 @@ class SystemMonitor:
     
     @staticmethod
     def get_all_stats() -> Dict[str, Any]:
-        """Get all system statistics."""
-        return {
+        """Get all system statistics.
+        
+        Results are cached for CACHE_TTL seconds so concurrent HTTP and
+        Socket.IO consumers share one snapshot.
+        """
+        timestamp, cached = SystemMonitor._cache
+        now = time.monotonic()
+        if cached is not None and now - timestamp < SystemMonitor.CACHE_TTL:
+            return cached
+        
+        stats = {
             'cpu': {
                 'usage': SystemMonitor.get_cpu_usage(),
                 'count': SystemMonitor.get_cpu_count()
@@ -107,6 +186,8 @@ class SystemMonitor:
             'network': SystemMonitor.get_network_stats(),
             'uptime': SystemMonitor.get_uptime()
         }
+        SystemMonitor._cache = (now, stats)
+        return stats
 
 
 class SystemModule:
@@ -126,6 +207,8 @@ class SystemModule:
         self.monitor = SystemMonitor()
         self.running = False
         self.thread = None
+        # Bumped on each start so a loop left over from a previous start exits
+        self._generation = 0
         
         if app and socketio:
             self.init_app(app, socketio)
@@ -140,16 +223,17 @@ class SystemModule:
         self.app = app
         self.socketio = socketio
         
+        # Sample CPU usage on a fixed cadence, independent of who is reading
+        socketio.start_background_task(self._cpu_sampler_loop)
+        
         # Register routes
         @app.route('/system')
         def system_view():
-            from flask import render_template
             stats = self.monitor.get_all_stats()
             return render_template('system.html', stats=stats)
         
         @app.route('/system/api/stats')
         def system_stats():
-            from flask import jsonify
             return jsonify(self.monitor.get_all_stats())
         
         # Socket.IO events
@@ -170,26 +254,45 @@ class SystemModule:
             return
         
         self.running = True
-        self.thread = Thread(target=self._monitor_loop, daemon=True)
-        self.thread.start()
+        self._generation += 1
+        # Runs on the Socket.IO server's event loop (greenlet under eventlet/gevent)
+        self.thread = self.socketio.start_background_task(self._monitor_loop, self._generation)
         logger.info("Started system monitoring")
     
-    def _monitor_loop(self):
-        """Monitor loop that sends stats via Socket.IO."""
-        while self.running:
+    def _cpu_sampler_loop(self):
+        """Refresh the shared CPU usage sample every update_interval."""
+        while True:
+            # Sleep first so each sample, including the first after priming,
+            # covers a full interval
+            self.socketio.sleep(self.update_interval)
+            try:
+                SystemMonitor.sample_cpu()
+            except Exception as e:
+                logger.error(f"Error sampling CPU usage: {e}")
+    
+    def _monitor_loop(self, generation: int):
+        """Monitor loop that sends stats via Socket.IO.
+        
+        Args:
+            generation: Start count this loop belongs to
+        """
+        while self.running and generation == self._generation:
             try:
                 stats = self.monitor.get_all_stats()
                 self.socketio.emit('system_stats_update', stats)
-                time.sleep(self.update_interval)
+                self.socketio.sleep(self.update_interval)
             except Exception as e:
                 logger.error(f"Error in monitor loop: {e}")
                 break
     
     def stop_monitoring(self):
-        """Stop real-time monitoring."""
+        """Stop real-time monitoring.
+        
+        The background task exits on its next wake-up; it is not joined since
+        this is usually called from a handler on the same event loop.
+        """
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
+        self.thread = None
         logger.info("Stopped system monitoring")
 
 